@@ -1,42 +1,80 @@
 import libtorrent as lt
 import time
 import sys
-import os
 import argparse
-from statistics import mean, stdev
+import numpy as np
 
-def perform_download(torrent_file, expected_size):
-    # Initilizing a new download session
+# Settings for a single swarm on a LAN: skip the internet discovery and port
+# mapping services (LSD stays on, it is how peers find each other on a LAN),
+# and let one fast peer keep a deep request pipeline full
+LAN_SETTINGS = {
+    'enable_dht': False,
+    'enable_upnp': False,
+    'enable_natpmp': False,
+    'send_buffer_watermark': 4 * 1024 * 1024,
+    'max_out_request_queue': 1500,
+    'whole_pieces_threshold': 64,
+    'piece_extent_affinity': True,
+    'disk_io_write_mode': int(lt.io_buffer_mode_t.write_through),
+}
+
+def create_session():
+    # Initilizing one download session that is shared by all trials
     print("[INFO] Initilizing download session.")
     sess = lt.session()
-    # Changed port numbers: using 7002 to 7012 for leecher
-    sess.listen_on(7002, 7012)
-    
-    # Record the start tiem using time.time()
-    start_time = time.time()
-    print("[INFO] Creating torrent info and addin torrent to session.")
-    torrent_info_obj = lt.torrent_info(torrent_file)
-    handle = sess.add_torrent({'ti': torrent_info_obj, 'save_path': '.'})
+    # Changed port numbers: using 7002 for leecher
+    # Only status alerts are needed to learn when the torrent is added and finished
+    sess.apply_settings(dict(LAN_SETTINGS, listen_interfaces='0.0.0.0:7002',
+                             alert_mask=lt.alert.category_t.status_notification))
+    return sess
+
+def perform_download(sess, params, expected_size, seeder=None):
+    # Record the start tiem with the monotonic nanosecond counter, wall clock
+    # time can jump under NTP adjustments
+    start_time = time.perf_counter_ns()
+    print("[INFO] Addin torrent to session.")
+    # Adding asyncronously keeps the storage setup and file check off this thread;
+    # the handle is picked up from the add_torrent_alert below
+    sess.async_add_torrent(params)
+    handle = None
     
-    # Loop untill the torrent status shows seedin (i.e., download is complte)
-    while not handle.status().is_seeding:
-        current_status = handle.status()
-        print(f"[LOG] Download progress: {current_status.progress:.4f}")
-        time.sleep(1)
+    # Block on the alert queue until the torrent finishes, so we wake up the
+    # moment the last piece arrives instead of on the next 1 sec poll
+    end_time = None
+    while end_time is None:
+        alert = sess.wait_for_alert(1000)
+        if alert is None:
+            if handle is None:
+                continue
+            current_status = handle.status()
+            print(f"[LOG] Download progress: {current_status.progress:.4f}")
+            if current_status.is_seeding:
+                end_time = time.perf_counter_ns()
+            continue
+        for alert in sess.pop_alerts():
+            if isinstance(alert, lt.add_torrent_alert):
+                if alert.error.value():
+                    raise RuntimeError(f"Failed to add torrent: {alert.error.message()}")
+                handle = alert.handle
+                # Dial the known seeder right away instead of waiting for peer discovery
+                if seeder is not None:
+                    handle.connect_peer(seeder)
+            elif isinstance(alert, lt.torrent_finished_alert) and alert.handle == handle:
+                # When download is complete, record the end tiem
+                end_time = time.perf_counter_ns()
+                break
     
-    # When download is complete, record the end tiem
-    end_time = time.time()
     final_status = handle.status()
     
     # Calculate elapsed tiem and other metrics
-    elapsed_time = end_time - start_time
+    elapsed_time = (end_time - start_time) / 1e9
     downloaded_bytes = final_status.total_download
     payload_bytes = final_status.total_payload_download
     computed_throughput = expected_size * 0.008 / elapsed_time
     normalized_transfer = downloaded_bytes / expected_size
     
     print("[INFO] Download complte. Calculatin metrics.")
-    return elapsed_time, computed_throughput, normalized_transfer, payload_bytes, sess, handle
+    return elapsed_time, computed_throughput, normalized_transfer, payload_bytes, handle
 
 def main():
     # Parse command line argumnts
@@ -44,53 +82,67 @@ def main():
     parser.add_argument("--torrent", type=str, required=True, help="Path to the torrent file")
     parser.add_argument("--trials", type=int, required=True, help="Number of download trials to run")
     parser.add_argument("--filesize", type=int, required=True, help="Expected file size in bytes")
+    parser.add_argument("--seeder", type=str, help="Seeder address as IP:PORT to connect to directly")
     args = parser.parse_args()
     
+    seeder = None
+    if args.seeder:
+        seeder_ip, seeder_port = args.seeder.rsplit(':', 1)
+        seeder = (seeder_ip, int(seeder_port))
+    
     # Create filenames based on current timestamp and file size for storring results
     timestamp = time.strftime("%Y%m%d-%H%M%S")
     details_file = f"{timestamp}_{args.filesize}_results.csv"
     summary_file = f"{timestamp}_{args.filesize}_summary.txt"
     
-    # Initilize lists to colect metrics for each trial
-    rtt_values = []
-    throughput_values = []
-    data_transfer_ratios = []
-    payload_values = []
+    # Preallocate arrays to colect metrics for each trial
+    rtt_values = np.empty(args.trials, dtype=np.float64)
+    throughput_values = np.empty(args.trials, dtype=np.float64)
+    data_transfer_ratios = np.empty(args.trials, dtype=np.float64)
+    payload_values = np.empty(args.trials, dtype=np.int64)
     trial_count = 0
     
+    # The session and the parsed torrent are reused by every trial
+    sess = create_session()
+    print("[INFO] Creating torrent info.")
+    params = lt.add_torrent_params()
+    params.ti = lt.torrent_info(args.torrent)
+    params.save_path = '.'
+    
     print("\n[INFO] Startin download trials...")
     while trial_count < args.trials:
         print(f"\n[INFO] Trial {trial_count} started.")
-        elapsed, thrpt, norm_transfer, payload, session_inst, handle = perform_download(args.torrent, args.filesize)
-        rtt_values.append(elapsed)
-        throughput_values.append(thrpt)
-        data_transfer_ratios.append(norm_transfer)
-        payload_values.append(payload)
+        elapsed, thrpt, norm_transfer, payload, handle = perform_download(sess, params, args.filesize, seeder)
+        rtt_values[trial_count] = elapsed
+        throughput_values[trial_count] = thrpt
+        data_transfer_ratios[trial_count] = norm_transfer
+        payload_values[trial_count] = payload
         trial_count += 1
         print(f"[INFO] Trial {trial_count} complete. Elapsed tiem: {elapsed:.2f} sec, Throughput: {thrpt:.2f} kb/s.")
         
-        # Remove downloaded file before starting next trial to reset state
-        base_name = args.torrent.split('.')[0]
-        if os.path.exists(base_name):
-            os.remove(base_name)
-            print(f"[LOG] Removed downloaded file: {base_name}")
-        session_inst.pause()
+        # Remove the torrent and let libtorrent delete the downloaded file before
+        # starting next trial to reset state
+        sess.remove_torrent(handle, lt.options_t.delete_files)
+        print(f"[LOG] Removed downloaded file: {args.torrent.split('.')[0]}")
+        # Nothing is left on disk, so there is nothing to hash-check on the next add
+        params.flags |= lt.torrent_flags.no_verify_files
         time.sleep(2)  # Optional pause between trials
     
     # Save detailed trial results to a CSV file
     print(f"[INFO] Saving detailed results to {details_file}")
-    with open(details_file, 'w') as f:
-        f.write("RTT,Throughput,TotalDataTransferred,TotalPayloadTransferred\n")
-        for i in range(args.trials):
-            f.write(f"{rtt_values[i]},{throughput_values[i]},{data_transfer_ratios[i]},{payload_values[i]}\n")
+    # Format every row in one go and write the file once
+    np.savetxt(details_file,
+               np.column_stack((rtt_values, throughput_values, data_transfer_ratios, payload_values)),
+               fmt=('%.9f', '%.6f', '%.9f', '%d'), delimiter=',',
+               header="RTT,Throughput,TotalDataTransferred,TotalPayloadTransferred", comments='')
     
     # Calculat summary statistics and save them to a summary file
     summary_stats = {
-        "RTT": mean(rtt_values),
-        "Throughput": mean(throughput_values),
-        "TotalDataTransferred": mean(data_transfer_ratios),
-        "TotalPayloadTransferred": mean(payload_values),
-        "Throughput_Std_Dev": stdev(throughput_values) if args.trials > 1 else 0
+        "RTT": float(rtt_values.mean()),
+        "Throughput": float(throughput_values.mean()),
+        "TotalDataTransferred": float(data_transfer_ratios.mean()),
+        "TotalPayloadTransferred": float(payload_values.mean()),
+        "Throughput_Std_Dev": float(throughput_values.std(ddof=1)) if args.trials > 1 else 0
     }
     print(f"[INFO] Saving summary results to {summary_file}")
     with open(summary_file, "w") as sf:
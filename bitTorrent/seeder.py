@@ -3,6 +3,19 @@ import sys
 import time
 import argparse
 
+# Settings for a single swarm on a LAN: skip the internet discovery and port
+# mapping services (LSD stays on, it is how peers find each other on a LAN),
+# and keep enough data queued on the socket to saturate one fast peer
+LAN_SETTINGS = {
+    'enable_dht': False,
+    'enable_upnp': False,
+    'enable_natpmp': False,
+    'send_buffer_watermark': 4 * 1024 * 1024,
+    'max_out_request_queue': 1500,
+    'whole_pieces_threshold': 64,
+    'piece_extent_affinity': True,
+}
+
 def start_seeding(torrent_filepath, output_dir, base_port):
     # Exract torrent name from the filepth for loggin purpuses
     torrent_name = torrent_filepath.split('.')[0]
@@ -10,8 +23,12 @@ def start_seeding(torrent_filepath, output_dir, base_port):
 
     # Crete a new session and listn on new port range
     session_instance = lt.session()
-    # Changed port numbers: using base_port range (e.g., 7001 to 7011)
-    session_instance.listen_on(base_port, base_port + 10)
+    # Changed port numbers: using base_port (e.g., 7001)
+    # Only status alerts are needed to follow state changes and completion
+    session_instance.apply_settings(dict(LAN_SETTINGS, listen_interfaces=f'0.0.0.0:{base_port}',
+                                         alert_mask=lt.alert.category_t.status_notification))
+    state_list = ['queued', 'checking', 'downloading metadata', 'downloading', 
+                  'finished', 'seeding', 'allocating', 'checking fastresume']
     trial_number = 0
 
     while True:
@@ -20,21 +37,35 @@ def start_seeding(torrent_filepath, output_dir, base_port):
         torrent_info_obj = lt.torrent_info(torrent_filepath)
         torrent_handle = session_instance.add_torrent({'ti': torrent_info_obj, 'save_path': output_dir})
         
-        # Wait untill the torrent is fully donlodad and seedin starts
-        while not torrent_handle.status().is_seeding:
-            current_status = torrent_handle.status()
-            progress_percent = current_status.progress * 100
-            down_rate = current_status.download_rate / 1000
-            up_rate = current_status.upload_rate / 1000
-            peers = current_status.num_peers
-            state_list = ['queued', 'checking', 'downloading metadata', 'downloading', 
-                          'finished', 'seeding', 'allocating', 'checking fastresume']
-            print(f'\r[LOG] {progress_percent:.2f}% complete (down: {down_rate:.1f} kb/s, '
-                  f'up: {up_rate:.1f} kB/s, peers: {peers}) - state: {state_list[current_status.state]}', end="")
-            # Flush output to update log on same line
-            sys.stdout.flush()
-            time.sleep(1)
+        # Wait untill the torrent is fully donlodad and seedin starts. Alerts
+        # wake us up on every state change, so the status line is only
+        # formatted when something actually changed
+        is_seeding = torrent_handle.status().is_seeding
+        while not is_seeding:
+            alert = session_instance.wait_for_alert(1000)
+            if alert is None:
+                is_seeding = torrent_handle.status().is_seeding
+                continue
+            for alert in session_instance.pop_alerts():
+                if not isinstance(alert, (lt.state_changed_alert, lt.torrent_finished_alert)):
+                    continue
+                if alert.handle != torrent_handle:
+                    continue
+                current_status = torrent_handle.status()
+                progress_percent = current_status.progress * 100
+                down_rate = current_status.download_rate / 1000
+                up_rate = current_status.upload_rate / 1000
+                peers = current_status.num_peers
+                print(f'\r[LOG] {progress_percent:.2f}% complete (down: {down_rate:.1f} kb/s, '
+                      f'up: {up_rate:.1f} kB/s, peers: {peers}) - state: {state_list[current_status.state]}', end="")
+                # Flush output to update log on same line
+                sys.stdout.flush()
+                if current_status.is_seeding:
+                    is_seeding = True
         
+        # The alert wakes us the instant checking is done, so keep the torrent
+        # seeding through the pause between trials before removing it
+        time.sleep(2)
         print(f"\n[INFO] Seedin trial {trial_number} for '{torrent_name}' complete.")
         status = torrent_handle.status()
         print(f"[INFO] Total uploded for trial {trial_number}: {status.total_upload} bytes.")
@@ -44,7 +75,6 @@ def start_seeding(torrent_filepath, output_dir, base_port):
         session_instance.remove_torrent(torrent_handle)
         trial_number += 1
         print(f"[INFO] Prepairing for the next trial...\n")
-        time.sleep(2)  # Optional pause between trials
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Seeder: Start seeding a torrent with logging.")
@@ -1,11 +1,18 @@
 import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
 import time
 import json
-import statistics
 import os
+import numpy as np
 
 computer1_url = 'http://172.30.115.112:8080'  
 
+concurrent_requests = 16
+
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_connections=4, pool_maxsize=concurrent_requests, max_retries=0))
+
 experiments = [
     {"file_size": "10kB", "repetitions": 1000},
     {"file_size": "100kB", "repetitions": 100},
@@ -14,61 +21,82 @@ experiments = [
 ]
 
 results_summary = {
-    "10kB": {"throughputs_kbps": [], "overhead_ratios": [], "avg_kbps": 0, "std_dev_kbps": 0, "avg_overhead": 0},
-    "100kB": {"throughputs_kbps": [], "overhead_ratios": [], "avg_kbps": 0, "std_dev_kbps": 0, "avg_overhead": 0},
-    "1MB": {"throughputs_kbps": [], "overhead_ratios": [], "avg_kbps": 0, "std_dev_kbps": 0, "avg_overhead": 0},
-    "10MB": {"throughputs_kbps": [], "overhead_ratios": [], "avg_kbps": 0, "std_dev_kbps": 0, "avg_overhead": 0}
+    size: {"throughputs_kbps": np.empty(0), "overhead_ratios": np.empty(0), "avg_kbps": 0, "std_dev_kbps": 0, "avg_overhead": 0}
+    for size in ("10kB", "100kB", "1MB", "10MB")
 }
 
+def fetch(url):
+    start_time = time.perf_counter_ns()
+    response = session.get(url, stream=True)
+    with response:
+        body = response.raw.read()
+    end_time = time.perf_counter_ns()
+    return response, len(body), (end_time - start_time) / 1e9
+
 def download_file(server_url, filename, repetitions):
-    throughputs_kbps = []
-    overhead_ratios = []
+    # Preallocated per-transfer results; only the first `completed` slots are filled
+    throughputs_kbps = np.empty(repetitions, dtype=np.float64)
+    overhead_ratios = np.empty(repetitions, dtype=np.float64)
+    completed = 0
     file_size_category = filename.split("_")[1]  
     
     print(f"Starting {repetitions} transfers of {filename}...")
     
-    for i in range(repetitions):
-        start_time = time.time()
-        try:
-            response = requests.get(f'{server_url}/download/{filename}')
-            end_time = time.time()
-            
-            if response.status_code == 200:
-                file_size_bytes = len(response.content)
-                
-                headers_size = 0
-                for name, value in response.headers.items():
-                    headers_size += len(name) + len(value) + 4
+    request_headers_size = None
+    url = f'{server_url}/download/{filename}'
+    progress_interval = max(1, min(repetitions // 10, 10))
+    
+    batch_start = time.perf_counter_ns()
+    with ThreadPoolExecutor(max_workers=concurrent_requests) as executor:
+        futures = [executor.submit(fetch, url) for _ in range(repetitions)]
+        
+        for i, future in enumerate(futures):
+            try:
+                response, file_size_bytes, transfer_time = future.result()
                 
-                request_headers_size = 0
-                for name, value in response.request.headers.items():
-                    request_headers_size += len(name) + len(value) + 4
+                if response.status_code == 200:
+                    headers = response.headers
+                    headers_size = sum(map(len, headers.keys())) + sum(map(len, headers.values())) + 4 * len(headers)
+                    
+                    if request_headers_size is None:
+                        request_headers = response.request.headers
+                        request_headers_size = (sum(map(len, request_headers.keys())) +
+                                                sum(map(len, request_headers.values())) + 4 * len(request_headers))
                 
-                total_data_transferred = headers_size + request_headers_size + file_size_bytes
+                    total_data_transferred = headers_size + request_headers_size + file_size_bytes
                 
-                overhead_ratio = total_data_transferred / file_size_bytes
+                    overhead_ratio = total_data_transferred / file_size_bytes
                 
-                transfer_time = end_time - start_time
-                throughput_bytes_per_second = file_size_bytes / transfer_time
+                    throughput_bytes_per_second = file_size_bytes / transfer_time
                 
-                throughput_kbps = (throughput_bytes_per_second * 8) / 1000
+                    throughput_kbps = (throughput_bytes_per_second * 8) / 1000
                 
-                throughputs_kbps.append(throughput_kbps)
-                overhead_ratios.append(overhead_ratio)
+                    throughputs_kbps[completed] = throughput_kbps
+                    overhead_ratios[completed] = overhead_ratio
+                    completed += 1
                 
-                progress_interval = max(1, min(repetitions // 10, 10))
-                if (i + 1) % progress_interval == 0:
-                    print(f"Progress: {i + 1}/{repetitions} transfers completed ({(i + 1)/repetitions*100:.1f}%)")
+                    if (i + 1) % progress_interval == 0:
+                        print(f"Progress: {i + 1}/{repetitions} transfers completed ({(i + 1)/repetitions*100:.1f}%)")
                 
-            else:
-                print(f"Failed to download {filename}: HTTP {response.status_code}")
+                else:
+                    print(f"Failed to download {filename}: HTTP {response.status_code}")
                 
-        except Exception as e:
-            print(f"Error downloading {filename}: {str(e)}")
+            except Exception as e:
+                print(f"Error downloading {filename}: {str(e)}")
+    batch_time = (time.perf_counter_ns() - batch_start) / 1e9
+    
+    throughputs_kbps = throughputs_kbps[:completed]
+    overhead_ratios = overhead_ratios[:completed]
+    
+    if completed:
+        batch_bytes = completed * file_size_bytes
+        print(f"Aggregate throughput with {concurrent_requests} concurrent requests: "
+              f"{batch_bytes * 8 / 1000 / batch_time:.2f} kbps")
     
-    if file_size_category in results_summary and throughputs_kbps:
-        results_summary[file_size_category]["throughputs_kbps"].extend(throughputs_kbps)
-        results_summary[file_size_category]["overhead_ratios"].extend(overhead_ratios)
+    if file_size_category in results_summary and completed:
+        summary = results_summary[file_size_category]
+        summary["throughputs_kbps"] = np.concatenate((summary["throughputs_kbps"], throughputs_kbps))
+        summary["overhead_ratios"] = np.concatenate((summary["overhead_ratios"], overhead_ratios))
     
     return throughputs_kbps, overhead_ratios
 
@@ -82,11 +110,11 @@ def run_experiments():
         download_file(computer1_url, a_filename, repetitions)
         
     for size, data in results_summary.items():
-        if data["throughputs_kbps"]:
-            data["avg_kbps"] = statistics.mean(data["throughputs_kbps"])
-            data["std_dev_kbps"] = statistics.stdev(data["throughputs_kbps"]) if len(data["throughputs_kbps"]) > 1 else 0
-        if data["overhead_ratios"]:
-            data["avg_overhead"] = statistics.mean(data["overhead_ratios"])
+        if data["throughputs_kbps"].size:
+            data["avg_kbps"] = float(data["throughputs_kbps"].mean())
+            data["std_dev_kbps"] = float(data["throughputs_kbps"].std(ddof=1)) if data["throughputs_kbps"].size > 1 else 0
+        if data["overhead_ratios"].size:
+            data["avg_overhead"] = float(data["overhead_ratios"].mean())
     
     with open("http1_1_throughput_results.json", "w") as f:
         clean_summary = {}
@@ -107,7 +135,7 @@ def run_experiments():
     print("File Size | Average Throughput | Standard Deviation | Overhead Ratio")
     print("-----------------------------------------------------------------")
     for size, data in results_summary.items():
-        if data["throughputs_kbps"]:
+        if data["throughputs_kbps"].size:
             print(f"{size:8} | {data['avg_kbps']:18.2f} | {data['std_dev_kbps']:18.2f} | {data['avg_overhead']:14.8f}")
     print("-----------------------------------------------------------------")
 
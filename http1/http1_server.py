@@ -1,60 +1,96 @@
-from flask import Flask, send_file, request
+from aiohttp import web
+import asyncio
 import time
 import os
+import atexit
+import queue
 import logging
+import logging.handlers
 from werkzeug.utils import secure_filename
 
-app = Flask(__name__)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+DATA_DIR = "Data files"
+FILE_BUFFER_SIZE = 65536
+
+# filename -> (path, size), filled once at startup so requests don't stat the disk
+FILES = {}
+
+def load_files(data_dir):
+    files = {}
+    for name in os.listdir(data_dir):
+        path = os.path.join(data_dir, name)
+        if os.path.isfile(path):
+            files[name] = (path, os.path.getsize(path))
+    return files
+
+routes = web.RouteTableDef()
+
+# Request handlers only enqueue log records; a single listener thread
+# formats them and writes the log file
+log_queue = queue.Queue(-1)
+log_file_handler = logging.FileHandler('http1_server.log')
+log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
 
 logging.basicConfig(
-    filename='http1_server.log',
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format='%(message)s',
+    handlers=[logging.handlers.QueueHandler(log_queue)]
 )
 
-@app.route('/download/<filename>', methods=['GET'])
-def download_file(filename):
-    safe_filename = secure_filename(filename)
-    file_path = f"Data files/{safe_filename}"
+@routes.get('/download/{filename}')
+async def download_file(request):
+    safe_filename = secure_filename(request.match_info['filename'])
+    entry = FILES.get(safe_filename)
     
-    if not os.path.exists(file_path):
+    if entry is None:
         logging.error(f"File not found: {safe_filename}")
-        return "File not found", 404
+        return web.Response(status=404, text="File not found")
 
-    file_size = os.path.getsize(file_path)
-    client_ip = request.headers.get('X-Forwarded-For', request.remote_addr)
-    logging.info(f"Serving file: {safe_filename} ({file_size} bytes) to {client_ip}")
+    file_path, file_size = entry
+    if logging.root.isEnabledFor(logging.INFO):
+        client_ip = request.headers.get('X-Forwarded-For', request.remote)
+        logging.info("Serving file: %s (%d bytes) to %s", safe_filename, file_size, client_ip)
     
-    return send_file(file_path, as_attachment=True)
+    # FileResponse pushes the body with loop.sendfile() where the event loop supports it
+    return web.FileResponse(
+        file_path,
+        chunk_size=FILE_BUFFER_SIZE,
+        headers={
+            'Content-Type': 'application/octet-stream',
+            'Content-Disposition': f'attachment; filename={safe_filename}'
+        }
+    )
+
+def stop_server():
+    raise web.GracefulExit()
 
-@app.route('/shutdown', methods=['POST'])
-def shutdown():
+@routes.post('/shutdown')
+async def shutdown(request):
     logging.info("Shutdown request received")
-    func = request.environ.get('werkzeug.server.shutdown')
-    if func is None:
-        logging.error("Failed to shut down - not running with Werkzeug Server")
-        raise RuntimeError('Not running with the Werkzeug Server')
-    func()
+    asyncio.get_running_loop().call_soon(stop_server)
     logging.info("Server shutting down")
-    return 'Server shutting down...'
+    return web.Response(text='Server shutting down...')
 
 if __name__ == '__main__':
-    os.makedirs("Data files", exist_ok=True)
+    os.makedirs(DATA_DIR, exist_ok=True)
     
     print("HTTP/1.1 Server starting...")
     print("Ensure 'Data files' directory contains the required test files (A_10kB, B_10kB, etc.)")
     
-    import logging
-    log = logging.getLogger('werkzeug')
-    log.disabled = True
-    
     logging.info("HTTP/1.1 Server starting on 0.0.0.0:8080")
     
-    data_dir = "Data files"
-    if os.path.exists(data_dir):
-        files = os.listdir(data_dir)
-        logging.info(f"Available files: {', '.join(files)}")
-    else:
-        logging.warning(f"Data directory '{data_dir}' not found")
+    FILES.update(load_files(DATA_DIR))
+    logging.info(f"Available files: {', '.join(FILES)}")
+    
+    loop = uvloop.new_event_loop() if uvloop is not None else None
     
-    app.run(host='0.0.0.0', port=8080, threaded=True)
\ No newline at end of file
+    app = web.Application()
+    app.add_routes(routes)
+    web.run_app(app, host='0.0.0.0', port=8080, access_log=None, print=None, loop=loop)
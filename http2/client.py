@@ -1,38 +1,85 @@
 import socket
+import sys
+import selectors
 import h2.connection
 import h2.config
 import h2.events
 import h2.settings
-from statistics import mean, stdev
+import math
 import time
 import os
 import json
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+MAX_IN_FLIGHT = 64
+# Where --verify looks for the reference copies of the served files
+DATA_DIR = "Data files"
+INITIAL_WINDOW_SIZE = 16 * 1024 * 1024
+# Let the server send DATA frames up to 128 KiB instead of the 16 KiB default
+MAX_FRAME_SIZE = 128 * 1024
+DEFAULT_CONNECTION_WINDOW = 65535
+CONNECTION_WINDOW_SIZE = 16 * 1024 * 1024
+SOCKET_TIMEOUT = 15
+# Fraction of a window consumed before its credit is handed back in one WINDOW_UPDATE
+WINDOW_UPDATE_RATIO = 0.5
+# recv_into only fills what has arrived, so a large buffer costs nothing on small
+# responses and lets bulk transfers drain the socket in far fewer calls
+RECV_BUFFER_SIZE = 1024 * 1024
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+# Linux only: ACK incoming segments at once instead of delaying them
+QUICKACK = hasattr(socket, 'TCP_QUICKACK')
 
 class HTTP2Client:
 
-    def __init__(self, server, port):
+    def __init__(self, server, port, compat=False):
         self.server = server
         self.port = port
+        self.compat = compat
+        self.authority = server.encode()
         self.socket = None
         self.connection = None
+        self.selector = None
+        self.connect_rtt = 0
+        self.recv_buffer = bytearray(RECV_BUFFER_SIZE)
+        self.recv_view = memoryview(self.recv_buffer)
+        # Our own request headers are well formed and only the response sizes are
+        # looked at, so skip h2's per-header validation and normalisation
+        self.config = h2.config.H2Configuration(
+            client_side=True,
+            validate_outbound_headers=False,
+            normalize_outbound_headers=False,
+            validate_inbound_headers=False,
+            normalize_inbound_headers=False
+        )
+        self.connection_window = DEFAULT_CONNECTION_WINDOW
+        self.stream_update_threshold = int(INITIAL_WINDOW_SIZE * WINDOW_UPDATE_RATIO)
+        self.connection_credit = 0
         self.settings = {
             h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 10000,
-            h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: 1048576
+            h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: INITIAL_WINDOW_SIZE,
+            h2.settings.SettingCodes.MAX_FRAME_SIZE: MAX_FRAME_SIZE
         }
         
-    def open_connection(self):
-        socket.setdefaulttimeout(15)
-
-        sock = socket.create_connection((self.server, self.port))
+    def connect(self):
+        # The TCP handshake doubles as a rough RTT sample for sizing the windows
+        connect_start = time.perf_counter_ns()
+        sock = socket.create_connection((self.server, self.port), timeout=SOCKET_TIMEOUT)
+        self.connect_rtt = (time.perf_counter_ns() - connect_start) / 1e9
         
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if QUICKACK:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_QUICKACK, 1)
         
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1048576)
+        # A fixed SO_RCVBUF or SO_SNDBUF turns off Linux's buffer autotuning, which
+        # already grows past this on fast links; elsewhere ask for buffers that cover the BDP
+        if not sys.platform.startswith('linux'):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
         
         self.socket = sock
-        
+
+    def upgrade_connection(self):
         upgrade_request = (
             b"GET / HTTP/1.1\r\n"
             b"Host: " + self.server.encode('utf-8') + b"\r\n"
@@ -44,141 +91,281 @@ class HTTP2Client:
         )
         self.socket.sendall(upgrade_request)
         
-        response = b""
-        while b"\r\n\r\n" not in response:
+        # Only the bytes that arrived since the last recv (plus 3 for a terminator
+        # split across reads) are searched for the end of the headers
+        response = bytearray()
+        header_end = -1
+        while header_end < 0:
             data = self.socket.recv(65535)
             if not data:
                 raise ConnectionError("Server closed connection without upgrading to HTTP/2")
+            search_start = max(0, len(response) - 3)
             response += data
+            header_end = response.find(b"\r\n\r\n", search_start)
         
-        if b"101 Switching Protocols" in response and b"Upgrade: h2c" in response:
-            self.connection = h2.connection.H2Connection()
-        else:
+        if not (b"101 Switching Protocols" in response and b"Upgrade: h2c" in response):
             self.socket.close()
-            sock = socket.create_connection((self.server, self.port))
-            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1048576)
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1048576)
-            self.socket = sock
-            self.connection = h2.connection.H2Connection()
+            self.connect()
+
+    def open_connection(self):
+        self.connect()
+        
+        # The test servers are known to speak h2c, so by default the connection
+        # preface goes out straight away (prior knowledge) instead of paying a
+        # round trip for the HTTP/1.1 Upgrade first
+        if self.compat:
+            self.upgrade_connection()
         
+        self.connection = h2.connection.H2Connection(config=self.config)
         self.connection.initiate_connection()
         
         self.connection.update_settings(self.settings)
         
+        # SETTINGS only covers the stream windows; the connection window starts at
+        # 64 KiB and is raised on its own so it never caps the streams sharing it
+        self.connection.increment_flow_control_window(CONNECTION_WINDOW_SIZE - DEFAULT_CONNECTION_WINDOW)
+        self.connection_window = CONNECTION_WINDOW_SIZE
+        if self.connect_rtt > 0:
+            print(f"Connection window {CONNECTION_WINDOW_SIZE // 1024} kB, stream window {INITIAL_WINDOW_SIZE // 1024} kB; "
+                  f"at {self.connect_rtt * 1000:.3f} ms RTT this sustains up to "
+                  f"{CONNECTION_WINDOW_SIZE * 8 / self.connect_rtt / 1e6:.0f} Mbps")
+        
         self.socket.sendall(self.connection.data_to_send())
+        
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.socket, selectors.EVENT_READ)
+
+    def request_headers(self, filename):
+        # Every request in a batch is identical, so the header list is built once per file
+        return [
+            (b':method', b'GET'),
+            (b':scheme', b'http'),
+            (b':authority', self.authority),
+            (b':path', f'/download/{filename}'.encode()),
+            (b'user-agent', b'http2-client/2.0'),
+            (b'accept', b'*/*'),
+        ]
+
+    def send_request(self, headers):
+        stream_id = self.connection.get_next_available_stream_id()
+        self.connection.send_headers(stream_id, headers, end_stream=True)
+        return stream_id
 
-    def download_file(self, filename, repetitions=1):
-        throughputs_kbps = []
-        overhead_ratios = []
+    def download_file(self, filename, repetitions=1, max_in_flight=MAX_IN_FLIGHT, verify=None):
+        # Running statistics (Welford's method for the throughput variance), so no
+        # per-transfer lists are kept
+        samples = 0
+        throughput_mean = 0.0
+        throughput_m2 = 0.0
+        overhead_sum = 0.0
         
         print(f"Starting {repetitions} transfers of {filename}...")
         
-        for i in range(repetitions):
-            start_time = time.time()
-            
-            headers = [
-                (b':method', b'GET'),
-                (b':scheme', b'http'),
-                (b':authority', self.server.encode()),
-                (b':path', f'/download/{filename}'.encode()),
-                (b'user-agent', b'http2-client/2.0'),
-                (b'accept', b'*/*'),
-            ]
-            
-            stream_id = self.connection.get_next_available_stream_id()
-            
-            self.connection.send_headers(stream_id, headers)
-            self.socket.sendall(self.connection.data_to_send())
-            
-            response_headers = {}
-            response_data = bytearray()
-            stream_ended = False
-            header_bytes = 0
-            
-            first_byte_time = None
-            last_byte_time = None
-            
-            while not stream_ended:
-                try:
-                    data = self.socket.recv(65536)
-                    if not data:
+        headers = self.request_headers(filename)
+        
+        # verify names a directory holding the same files as the server; every body
+        # is compared byte for byte with its copy there
+        if verify:
+            reference_path = os.path.join(verify, filename)
+            with open(reference_path, 'rb') as f:
+                reference = f.read()
+            mismatches = 0
+        
+        # Bind everything the per-event loop touches to locals once
+        perf_counter_ns = time.perf_counter_ns
+        connection = self.connection
+        sock = self.socket
+        selector = self.selector
+        receive_data = connection.receive_data
+        data_to_send = connection.data_to_send
+        increment_flow_control_window = connection.increment_flow_control_window
+        recv_into = sock.recv_into
+        recv_buffer = self.recv_buffer
+        recv_view = self.recv_view
+        stream_update_threshold = self.stream_update_threshold
+        connection_update_threshold = self.connection_window * WINDOW_UPDATE_RATIO
+        connection_credit = self.connection_credit
+        ResponseReceived = h2.events.ResponseReceived
+        DataReceived = h2.events.DataReceived
+        StreamEnded = h2.events.StreamEnded
+        StreamReset = h2.events.StreamReset
+        EVENT_READ = selectors.EVENT_READ
+        EVENT_WRITE = selectors.EVENT_WRITE
+        IPPROTO_TCP = socket.IPPROTO_TCP
+        TCP_QUICKACK = getattr(socket, 'TCP_QUICKACK', None)
+        
+        max_in_flight = min(max_in_flight, self.connection.remote_settings.max_concurrent_streams)
+        streams = {}
+        requested = 0
+        completed = 0
+        
+        # Transfers run on a non-blocking socket driven by the selector, so queued
+        # frames are written whenever the socket can take them instead of
+        # stalling reads behind a blocking sendall
+        out_buffer = bytearray()
+        interest = EVENT_READ
+        sock.setblocking(False)
+        
+        try:
+            while completed < repetitions:
+                # Like the HTTP/1.1 client, a transfer is timed from sending its request
+                # to the read that delivers its last byte
+                request_time = perf_counter_ns()
+                while requested < repetitions and len(streams) < max_in_flight:
+                    stream_id = self.send_request(headers)
+                    streams[stream_id] = {
+                        'header_bytes': 0,
+                        'frames': 0,
+                        'content_length': None,
+                        'response_data': bytearray() if verify else None,
+                        'received': 0,
+                        'credit': 0,
+                        'request_time': request_time,
+                        'last_byte_time': None
+                    }
+                    requested += 1
+                
+                # Everything h2 queued during the last pass goes out in one write; the
+                # selector is only asked to wait for writability if the socket
+                # could not take it all
+                out_buffer += data_to_send()
+                if out_buffer:
+                    try:
+                        sent = sock.send(out_buffer)
+                        del out_buffer[:sent]
+                    except BlockingIOError:
+                        pass
+                wanted = EVENT_READ | EVENT_WRITE if out_buffer else EVENT_READ
+                if wanted != interest:
+                    selector.modify(sock, wanted)
+                    interest = wanted
+                
+                events = []
+                ready = selector.select(SOCKET_TIMEOUT)
+                if not ready:
+                    print(f"Socket timeout after {completed} transfers of {filename}")
+                    break
+                
+                mask = ready[0][1]
+                if mask & EVENT_WRITE:
+                    sent = sock.send(out_buffer)
+                    del out_buffer[:sent]
+                
+                if mask & EVENT_READ:
+                    received = recv_into(recv_buffer)
+                    read_time = perf_counter_ns()
+                    if not received:
+                        print(f"Connection closed after {completed} transfers of {filename}")
                         break
                     
-                    events = self.connection.receive_data(data)
-                    
-                    for event in events:
-                        if isinstance(event, h2.events.ResponseReceived):
-                            for header in event.headers:
-                                name, value = header
-                                name_str = name.decode('utf-8') if isinstance(name, bytes) else name
-                                value_str = value.decode('utf-8') if isinstance(value, bytes) else value
-                                response_headers[name_str] = value_str
-                                header_bytes += len(name) + len(value)
-                                
-                        elif isinstance(event, h2.events.DataReceived):
-                            if first_byte_time is None and event.data:
-                                first_byte_time = time.time()
-                            
-                            response_data.extend(event.data)
-                            
-                            if event.data:
-                                last_byte_time = time.time()
-                            
-                            self.connection.acknowledge_received_data(
-                                event.flow_controlled_length, 
-                                event.stream_id
-                            )
-                            
-                        elif isinstance(event, h2.events.StreamEnded):
-                            stream_ended = True
-                            if last_byte_time is None:
-                                last_byte_time = time.time()
-                            if first_byte_time is None:
-                                first_byte_time = last_byte_time
-                            break
+                    # The kernel drops out of quick-ACK mode on its own, so turn it back on
+                    if QUICKACK:
+                        sock.setsockopt(IPPROTO_TCP, TCP_QUICKACK, 1)
                     
-                    self.socket.sendall(self.connection.data_to_send())
+                    # h2 copies the bytes into its own frame buffer, so the receive buffer can be reused
+                    events = receive_data(recv_view[:received])
+                
+                for event in events:
+                    stream = streams.get(getattr(event, 'stream_id', None))
+                    if stream is None:
+                        continue
                     
-                except socket.timeout:
-                    print(f"Socket timeout on transfer {i} of {filename}")
-                    break
-                except Exception as e:
-                    print(f"Error during transfer {i} of {filename}: {e}")
-                    break
-            
-            if first_byte_time is None:
-                first_byte_time = time.time()
-            if last_byte_time is None:
-                last_byte_time = time.time()
-            
-            transfer_time = last_byte_time - first_byte_time
-            
-            file_size_bytes = len(response_data)
-            
-            frame_count = (file_size_bytes // 16384) + 1
-            framing_overhead = frame_count * 9
-            
-            total_data_transferred = header_bytes + file_size_bytes + framing_overhead
-            
-            overhead_ratio = total_data_transferred / file_size_bytes if file_size_bytes > 0 else 0
-            
-            if transfer_time > 0:
-                throughput_bps = file_size_bytes / transfer_time
-                throughput_kbps = (throughput_bps * 8) / 1000
-            else:
-                throughput_kbps = 0
+                    event_type = type(event)
+                    # DATA frames outnumber every other event, so they are checked first
+                    if event_type is DataReceived:
+                        data = event.data
+                        
+                        # Only the byte count matters for throughput; the body itself is
+                        # dropped unless it is being kept for verification
+                        stream['frames'] += 1
+                        received = stream['received']
+                        if verify:
+                            stream['response_data'][received:received + len(data)] = data
+                        stream['received'] = received + len(data)
+                        
+                        if data:
+                            stream['last_byte_time'] = read_time
+                        
+                        # Hand back flow-control credit in large steps rather than per frame
+                        connection_credit += event.flow_controlled_length
+                        stream['credit'] += event.flow_controlled_length
+                        if event.stream_ended is None and stream['credit'] >= stream_update_threshold:
+                            increment_flow_control_window(stream['credit'], stream_id=event.stream_id)
+                            stream['credit'] = 0
+                        
+                    elif event_type is ResponseReceived:
+                        stream['frames'] += 1
+                        # Headers stay as raw bytes; only their size and the content length are needed
+                        header_bytes = 0
+                        for name, value in event.headers:
+                            header_bytes += len(name) + len(value)
+                            if name == b'content-length':
+                                stream['content_length'] = int(value)
+                        stream['header_bytes'] += header_bytes
+                        if verify and stream['content_length'] is not None:
+                            stream['response_data'] = bytearray(stream['content_length'])
+                            
+                    elif event_type is StreamEnded or event_type is StreamReset:
+                        del streams[event.stream_id]
+                        completed += 1
+                        
+                        if event_type is StreamReset:
+                            print(f"Stream {event.stream_id} reset by server (error code {event.error_code})")
+                            continue
+                        
+                        if stream['last_byte_time'] is None:
+                            stream['last_byte_time'] = read_time
+                        
+                        transfer_time = (stream['last_byte_time'] - stream['request_time']) / 1e9
+                        
+                        file_size_bytes = stream['received']
+                        
+                        if stream['content_length'] is not None and file_size_bytes != stream['content_length']:
+                            print(f"Stream {event.stream_id}: got {file_size_bytes} bytes, "
+                                  f"expected {stream['content_length']}")
+                        if verify and stream['response_data'] != reference:
+                            mismatches += 1
+                            print(f"Stream {event.stream_id}: body differs from {reference_path}")
+                        
+                        # Each HEADERS and DATA frame the response arrived in (including an
+                        # empty END_STREAM one) carries a 9-byte frame header
+                        total_data_transferred = stream['header_bytes'] + file_size_bytes + stream['frames'] * 9
+                        
+                        overhead_ratio = total_data_transferred / file_size_bytes if file_size_bytes > 0 else 0
+                        
+                        throughput_bps = file_size_bytes / transfer_time
+                        throughput_kbps = (throughput_bps * 8) / 1000
+                        
+                        samples += 1
+                        delta = throughput_kbps - throughput_mean
+                        throughput_mean += delta / samples
+                        throughput_m2 += delta * (throughput_kbps - throughput_mean)
+                        overhead_sum += overhead_ratio
+                        
+                        if repetitions > 10 and completed % (repetitions // 10) == 0:
+                            print(f"Progress: {completed}/{repetitions} transfers ({completed/repetitions*100:.1f}%)")
                 
-            throughputs_kbps.append(throughput_kbps)
-            overhead_ratios.append(overhead_ratio)
-            
-            if repetitions > 10 and (i + 1) % (repetitions // 10) == 0:
-                print(f"Progress: {i + 1}/{repetitions} transfers ({(i + 1)/repetitions*100:.1f}%)")
+                if connection_credit >= connection_update_threshold:
+                    increment_flow_control_window(connection_credit)
+                    connection_credit = 0
+        except Exception as e:
+            # A timeout or socket error ends the batch; per-pass checks stay out of the loop
+            print(f"Error after {completed} transfers of {filename}: {e}")
+        
+        self.connection_credit = connection_credit
+        
+        # Hand anything still queued back to the blocking socket for the next batch
+        sock.settimeout(SOCKET_TIMEOUT)
+        if out_buffer:
+            sock.sendall(out_buffer)
             
-        avg_throughput = mean(throughputs_kbps) if throughputs_kbps else 0
-        avg_overhead = mean(overhead_ratios) if overhead_ratios else 0
+        if verify:
+            print(f"Verified {samples - mismatches} of {samples} bodies against {reference_path}")
         
-        std_dev_throughput = stdev(throughputs_kbps) if len(throughputs_kbps) > 1 else 0
+        avg_throughput = throughput_mean if samples else 0
+        avg_overhead = overhead_sum / samples if samples else 0
+        
+        std_dev_throughput = math.sqrt(throughput_m2 / (samples - 1)) if samples > 1 else 0
             
         return {
             "avg_throughput_kbps": avg_throughput,
@@ -191,56 +378,67 @@ class HTTP2Client:
         if self.connection and self.socket:
             self.connection.close_connection()
             self.socket.sendall(self.connection.data_to_send())
+            self.selector.close()
             self.socket.close()
+            self.selector = None
             self.socket = None
             self.connection = None
 
-def run_experiments(computer1_ip, computer1_port, computer2_ip=None, computer2_port=None):
-    
-    experiments = [
-        {"file_size": "10kB", "repetitions": 1000},
-        {"file_size": "100kB", "repetitions": 100},
-        {"file_size": "1MB", "repetitions": 10},
-        {"file_size": "10MB", "repetitions": 1}
-    ]
-    
+EXPERIMENTS = [
+    {"file_size": "10kB", "repetitions": 1000},
+    {"file_size": "100kB", "repetitions": 100},
+    {"file_size": "1MB", "repetitions": 10},
+    {"file_size": "10MB", "repetitions": 1}
+]
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+def run_computer(name, ip, port, prefix, compat=False, max_in_flight=MAX_IN_FLIGHT):
     results = {}
     
-    print(f"\nConnecting to Computer 1 ({computer1_ip}:{computer1_port})...")
-    client1 = HTTP2Client(computer1_ip, computer1_port)
-    client1.open_connection()
+    print(f"\nConnecting to {name} ({ip}:{port})...")
+    client = HTTP2Client(ip, port, compat)
+    client.open_connection()
     
     try:
-        for exp in experiments:
+        for exp in EXPERIMENTS:
             file_size = exp["file_size"]
             repetitions = exp["repetitions"]
-            filename = f"A_{file_size}"
+            filename = f"{prefix}_{file_size}"
             
             print(f"\nRunning experiment: {repetitions} transfers of {filename}")
-            result = client1.download_file(filename, repetitions)
+            result = client.download_file(filename, repetitions, max_in_flight)
             
             results[filename] = result
     
     finally:
-        client1.close_connection()
+        client.close_connection()
+    
+    return results
+
+def run_experiments(computer1_ip, computer1_port, computer2_ip=None, computer2_port=None, compat=False,
+                    max_in_flight=MAX_IN_FLIGHT, parallel=False):
     
+    runs = [("Computer 1", computer1_ip, computer1_port, "A")]
     if computer2_ip and computer2_port:
-        print(f"\nConnecting to Computer 2 ({computer2_ip}:{computer2_port})...")
-        client2 = HTTP2Client(computer2_ip, computer2_port)
-        client2.open_connection()
-        
-        try:
-            for exp in experiments:
-                file_size = exp["file_size"]
-                repetitions = exp["repetitions"]
-                filename = f"B_{file_size}"
-                
-                print(f"\nRunning experiment: {repetitions} transfers of {filename}")
-                result = client2.download_file(filename, repetitions)
-                
-                results[filename] = result
-        finally:
-            client2.close_connection()
+        runs.append(("Computer 2", computer2_ip, computer2_port, "B"))
+    
+    results = {}
+    
+    # Each computer gets its own client and connection, so the two sweeps can run
+    # side by side in threads; they still share the GIL, which skews both results
+    if parallel and len(runs) > 1:
+        with ThreadPoolExecutor(max_workers=len(runs)) as executor:
+            futures = [executor.submit(run_computer, *run, compat, max_in_flight) for run in runs]
+            for future in futures:
+                results.update(future.result())
+    else:
+        for run in runs:
+            results.update(run_computer(*run, compat, max_in_flight))
     
     with open("http2_results.json", "w") as f:
         json.dump(results, f, indent=2)
@@ -265,15 +463,22 @@ if __name__ == "__main__":
     parser.add_argument('--port2', type=int, help='Second server port (optional)')
     parser.add_argument('--file', help='Single file to download (skips full experiment)')
     parser.add_argument('--repeats', type=int, default=1, help='Number of repeats for single file download')
+    parser.add_argument('--verify', nargs='?', const=DATA_DIR, metavar='DIR',
+                        help=f'With --file, compare every response body with the same file in DIR (default: "{DATA_DIR}")')
+    parser.add_argument('--window', type=positive_int, default=MAX_IN_FLIGHT,
+                        help='Number of requests kept in flight on the connection (1 = stop-and-wait)')
+    parser.add_argument('--parallel', action='store_true',
+                        help='Run the Computer 1 and Computer 2 sweeps at the same time (skews both results)')
+    parser.add_argument('--compat', action='store_true', help='Negotiate h2c with an HTTP/1.1 Upgrade instead of prior knowledge')
     
     args = parser.parse_args()
     
     if args.file:
-        client = HTTP2Client(args.server, args.port)
+        client = HTTP2Client(args.server, args.port, args.compat)
         client.open_connection()
         
         try:
-            result = client.download_file(args.file, args.repeats)
+            result = client.download_file(args.file, args.repeats, args.window, verify=args.verify)
             print("\nDownload Results:")
             print(f"File: {args.file}")
             print(f"Average throughput: {result['avg_throughput_kbps']:.6f} kbps")
@@ -287,5 +492,8 @@ if __name__ == "__main__":
             args.server, 
             args.port,
             args.server2,
-            args.port2
+            args.port2,
+            args.compat,
+            args.window,
+            args.parallel
         )
\ No newline at end of file
@@ -1,277 +1,664 @@
-import socketserver
+import asyncio
+import contextlib
+import mmap
 import socket
+import struct
+import sys
+import threading
 import h2.connection
 import h2.config
+import h2.errors
 import h2.events
 import h2.settings
+import hpack
 import time
 import os
 import logging
+import logging.handlers
+import queue
+import re
+import atexit
 import json
 import psutil
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Connections only enqueue log records; a single listener thread formats them
+# and writes the log file
+log_queue = queue.Queue(-1)
+log_file_handler = logging.FileHandler('http2_server.log')
+log_file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+log_listener = logging.handlers.QueueListener(log_queue, log_file_handler)
+log_listener.start()
+atexit.register(log_listener.stop)
+
 logging.basicConfig(
-    filename='http2_server.log',
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
+    format='%(message)s',
+    handlers=[logging.handlers.QueueHandler(log_queue)]
 )
 
 DATA_DIR = "Data files"
 BUFFER_SIZE = 1048576
+INITIAL_WINDOW_SIZE = 16 * 1024 * 1024
+# Largest DATA frame we accept; outbound frames use the largest the client allows,
+# capped at the same size
+MAX_FRAME_SIZE = 128 * 1024
+# Bytes the transport may buffer before a writer waits in drain()
+WRITE_BUFFER_HIGH_WATER = 1048576
+SOCKET_BUFFER_SIZE = 4 * 1024 * 1024
+# Linux only: hold back partial segments while a response is being written, so its
+# HEADERS frame and first DATA frames leave in full-sized packets
+CORK = hasattr(socket, 'TCP_CORK')
+CONGESTION_CONTROL = b'bbr'
+# Allowlist for requested file names; rules out path separators, control bytes and
+# the '.' and '..' directory entries
+VALID_NAME = re.compile(r'(?!\.\.?$)[A-Za-z0-9._-]{1,255}').fullmatch
+# A prior-knowledge client opens with the connection preface, never an Upgrade request
+H2_PREFACE = b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'
+
+# Cleartext h2c lets DATA payloads go straight from the page cache to the socket
+# with sendfile(2); only the 9-byte frame header is written from Python.
+# The stdlib loop does this through loop.sendfile(); uvloop has none, so under it
+# os.sendfile() is called on the socket directly
+USE_SENDFILE = sys.platform.startswith('linux') and hasattr(os, 'sendfile')
+# length (24 bits, split 8 + 16), type, flags, stream id
+FRAME_HEADER = struct.Struct('>BHBBI')
+DATA_FRAME = 0x0
+HEADERS_FRAME = 0x1
+END_HEADERS = 0x4
+# Without sendfile, DATA frames are gathered and handed to the transport in batches;
+# each frame is two buffers, its header and a slice of the mapped file
+SEND_BATCH_FRAMES = 16
+SEND_BATCH_BYTES = 256 * 1024
+# Files up to this size are kept in memory, pre-split into MAX_FRAME_SIZE payloads
+FRAME_CACHE_MAX_FILE_SIZE = 1024 * 1024
+# Total bytes held by FRAME_CACHE; files past it are served from disk
+FRAME_CACHE_BUDGET = 200 * 1024 * 1024
+
+# Fixed part of the error response headers, as bytes so h2 has nothing to encode
+ERROR_CONTENT_TYPE = (b'content-type', b'text/plain')
+
+# filename -> (file size, path), filled once at startup so requests don't stat the disk
+FILE_INDEX = {}
+
+# Never-indexed literals leave both HPACK dynamic tables untouched, so blocks built from
+# them are valid on any connection and never have to pass through its encoder
+HEADER_ENCODER = hpack.Encoder()
+# filename -> HPACK block of its 200 response headers, filled at startup
+HEADER_CACHE = {}
+# filename -> list of DATA payloads, filled at startup
+FRAME_CACHE = {}
+
+# Latest readings from the sampler thread; psutil calls cost tens of microseconds,
+# too much to make each time a connection closes
+SYSTEM_SAMPLE_INTERVAL = 5
+SYSTEM_USAGE = {'cpu_percent': None, 'memory_percent': None}
+
+def sample_system_usage():
+    while True:
+        # cpu_percent() blocks for the interval and reports the average over it
+        SYSTEM_USAGE['cpu_percent'] = psutil.cpu_percent(interval=SYSTEM_SAMPLE_INTERVAL)
+        SYSTEM_USAGE['memory_percent'] = psutil.virtual_memory().percent
+
+def split_file(file_path):
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return [data[offset:offset + MAX_FRAME_SIZE] for offset in range(0, len(data), MAX_FRAME_SIZE)]
+
+def encode_response_headers(filename, file_size):
+    return HEADER_ENCODER.encode([
+        hpack.NeverIndexedHeaderTuple(':status', '200'),
+        hpack.NeverIndexedHeaderTuple('content-type', 'application/octet-stream'),
+        hpack.NeverIndexedHeaderTuple('content-length', str(file_size)),
+        hpack.NeverIndexedHeaderTuple('server', 'h2-server/2.0'),
+        hpack.NeverIndexedHeaderTuple('cache-control', 'no-cache'),
+        hpack.NeverIndexedHeaderTuple('x-file-name', filename)
+    ])
+
+# Per-stream timings in monotonic nanoseconds; 0 means not reached yet
+class StreamMetrics:
+    __slots__ = ('path', 'method', 'start_ns', 'headers_sent_ns', 'first_byte_ns', 'last_byte_ns', 'bytes_sent')
+    
+    def __init__(self, path, method, start_ns):
+        self.path = path
+        self.method = method
+        self.start_ns = start_ns
+        self.headers_sent_ns = 0
+        self.first_byte_ns = 0
+        self.last_byte_ns = 0
+        self.bytes_sent = 0
+
+# Shared by every connection; h2 only reads it
+H2_CONFIG = h2.config.H2Configuration(client_side=False)
 
 class H2Protocol:
     def __init__(self):
-        config = h2.config.H2Configuration(client_side=False)
-        self.conn = h2.connection.H2Connection(config=config)
-        self.known_streams = {}
-        
         self.settings = {
             h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 10000,
-            h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: BUFFER_SIZE,
+            h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: INITIAL_WINDOW_SIZE,
+            h2.settings.SettingCodes.MAX_FRAME_SIZE: MAX_FRAME_SIZE,
             h2.settings.SettingCodes.HEADER_TABLE_SIZE: 65536,
             h2.settings.SettingCodes.ENABLE_PUSH: 0
         }
         
+        self.conn = h2.connection.H2Connection(config=H2_CONFIG)
+        self.known_streams = {}
+        # Filled by the reader task; None marks the end of the connection
+        self.pending_events = asyncio.Queue()
+        # Set by the reader task whenever the client returns flow-control credit
+        self.window_updated = asyncio.Event()
+        # Held while a DATA frame is written in pieces so nothing lands inside it
+        self.write_lock = asyncio.Lock()
+        self.closed = False
+        
         self.request_count = 0
         self.bytes_sent = 0
         self.active_connections = 0
 
-    def handle_request(self, sock):
+    async def handle_request(self, reader, writer, initial_data=b''):
+        sock = writer.get_extra_info('socket')
+        self.client_address = writer.get_extra_info('peername')
         sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        # A fixed SO_SNDBUF turns off Linux's send buffer autotuning, which already
+        # grows past this on fast links; elsewhere ask for buffers that cover the BDP
+        if not sys.platform.startswith('linux'):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SOCKET_BUFFER_SIZE)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, SOCKET_BUFFER_SIZE)
+        if hasattr(socket, 'TCP_CONGESTION'):
+            try:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CONGESTION, CONGESTION_CONTROL)
+            except OSError:
+                # Not loaded, or not in net.ipv4.tcp_allowed_congestion_control
+                pass
+        self.sock = sock
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER_HIGH_WATER)
         
         self.conn.initiate_connection()
         
         self.conn.update_settings(self.settings)
         
-        sock.sendall(self.conn.data_to_send())
+        writer.write(self.conn.data_to_send())
         
         connection_start = time.time()
         self.active_connections += 1
 
+        # Reading runs in its own task so WINDOW_UPDATEs keep arriving while a file
+        # is being served; requests are still served one at a time, in order
+        read_task = asyncio.create_task(self.read_frames(reader, writer, initial_data))
+        
+        next_event = self.pending_events.get
+        RequestReceived = h2.events.RequestReceived
+        StreamEnded = h2.events.StreamEnded
+        ConnectionTerminated = h2.events.ConnectionTerminated
         try:
             while True:
                 try:
-                    data = sock.recv(BUFFER_SIZE)
-                    if not data:
+                    event = await next_event()
+                    # Requests still queued when the client went away have nowhere to go
+                    if event is None or self.closed:
                         break
 
-                    events = self.conn.receive_data(data)
-                    for event in events:
-                        if isinstance(event, h2.events.RequestReceived):
-                            self.handle_request_received(event, sock)
-                        elif isinstance(event, h2.events.DataReceived):
-                            self.handle_data_received(event, sock)
-                        elif isinstance(event, h2.events.StreamEnded):
-                            self.handle_stream_ended(event, sock)
-                        elif isinstance(event, h2.events.ConnectionTerminated):
-                            logging.info(f"Connection terminated by client after {time.time() - connection_start:.2f} seconds")
-                            return
-
-                    data_to_send = self.conn.data_to_send()
-                    if data_to_send:
-                        sock.sendall(data_to_send)
+                    event_type = type(event)
+                    if event_type is RequestReceived:
+                        await self.handle_request_received(event, writer)
+                    elif event_type is StreamEnded:
+                        self.handle_stream_ended(event)
+                    elif event_type is ConnectionTerminated:
+                        logging.info("Connection terminated by client after %.2f seconds", time.time() - connection_start)
+                        return
+
+                    await self.flush(writer)
                         
-                except (socket.timeout, socket.error) as e:
+                except (ConnectionError, OSError) as e:
                     logging.error(f"Socket error: {e}")
                     break
                 except Exception as e:
                     logging.error(f"Error handling request: {e}", exc_info=True)
                     break
         finally:
+            read_task.cancel()
+            # Let the reader finish its cleanup before the connection is closed under it
+            await asyncio.wait([read_task])
             self.active_connections -= 1
             connection_duration = time.time() - connection_start
-            logging.info(f"Connection closed. Duration: {connection_duration:.2f}s, Bytes sent: {self.bytes_sent}")
+            logging.info("Connection closed. Duration: %.2fs, Bytes sent: %d", connection_duration, self.bytes_sent)
             
-            cpu_percent = psutil.cpu_percent()
-            memory_percent = psutil.virtual_memory().percent
-            logging.info(f"System resources - CPU: {cpu_percent}%, Memory: {memory_percent}%")
+            logging.info("System resources - CPU: %s%%, Memory: %s%%", SYSTEM_USAGE['cpu_percent'], SYSTEM_USAGE['memory_percent'])
 
-    def handle_request_received(self, event, sock):
-        stream_id = event.stream_id
-        headers = dict(event.headers)
+    async def read_frames(self, reader, writer, data):
+        read = reader.read
+        receive_data = self.conn.receive_data
+        window_opened = self.window_updated.set
+        queue_event = self.pending_events.put_nowait
+        WindowUpdated = h2.events.WindowUpdated
+        DataReceived = h2.events.DataReceived
         
-        headers = {k.decode('utf-8'): v.decode('utf-8') for k, v in headers.items()}
+        # A prior-knowledge client's preface may already have been read while
+        # checking for an upgrade request
+        try:
+            while True:
+                if not data:
+                    data = await read(BUFFER_SIZE)
+                    if not data:
+                        break
+
+                events = receive_data(data)
+                data = b''
+                for event in events:
+                    event_type = type(event)
+                    if event_type is WindowUpdated:
+                        window_opened()
+                    elif event_type is DataReceived:
+                        self.handle_data_received(event)
+                    else:
+                        queue_event(event)
+
+                # A SETTINGS change to the initial window also grants credit
+                window_opened()
+                await self.flush(writer)
+        except (ConnectionError, OSError) as e:
+            logging.error(f"Socket error: {e}")
+        except Exception as e:
+            logging.error(f"Error reading frames: {e}", exc_info=True)
+        finally:
+            self.closed = True
+            self.window_updated.set()
+            self.pending_events.put_nowait(None)
+
+    def write_pending(self, writer):
+        # Most passes leave h2 with nothing to send; skip the empty write
+        data_to_send = self.conn.data_to_send()
+        if data_to_send:
+            writer.write(data_to_send)
+        return bool(data_to_send)
+
+    async def flush(self, writer):
+        async with self.write_lock:
+            if self.write_pending(writer):
+                await writer.drain()
+
+    async def handle_request_received(self, event, writer):
+        stream_id = event.stream_id
         
-        path = headers.get(':path', '')
-        method = headers.get(':method', '')
+        # Only the two pseudo-headers are needed; they come first in the block
+        path = method = ''
+        for name, value in event.headers:
+            if name == b':path':
+                path = value.decode('utf-8')
+            elif name == b':method':
+                method = value.decode('utf-8')
+            if path and method:
+                break
         
-        client_address = sock.getpeername()
-        logging.info(f"Request from {client_address[0]}:{client_address[1]} - {method} {path}")
+        logging.info("Request from %s:%d - %s %s", self.client_address[0], self.client_address[1], method, path)
         
-        self.known_streams[stream_id] = {
-            'headers': headers, 
-            'path': path, 
-            'method': method,
-            'start_time': time.time(),
-            'headers_sent_time': None,
-            'first_byte_time': None,
-            'last_byte_time': None,
-            'bytes_sent': 0
-        }
+        self.known_streams[stream_id] = StreamMetrics(path, method, time.monotonic_ns())
         
         self.request_count += 1
         
         if method == 'GET' and path.startswith('/download/'):
             filename = path[10:]
-            self.serve_file(stream_id, filename, sock)
+            await self.serve_file(stream_id, filename, writer)
 
-    def serve_file(self, stream_id, filename, sock):
-        if '..' in filename or '/' in filename or '\\' in filename:
-            self.send_error_response(stream_id, 400, "Invalid filename", sock)
+    async def serve_file(self, stream_id, filename, writer):
+        if not VALID_NAME(filename):
+            await self.send_error_response(stream_id, 400, "Invalid filename", writer)
             return
             
-        file_path = os.path.join(DATA_DIR, filename)
+        entry = FILE_INDEX.get(filename)
         
-        if not os.path.exists(file_path):
-            self.send_error_response(stream_id, 404, "File not found", sock)
+        if entry is None:
+            await self.send_error_response(stream_id, 404, "File not found", writer)
             return
             
+        file_size, file_path = entry
+        # Once the raw HEADERS frame is out, h2 doesn't know about it and would let a
+        # 500 go out as a second response on the stream
+        headers_sent = False
+        if CORK:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 1)
         try:
-            file_size = os.path.getsize(file_path)
-            
-            client_address = sock.getpeername()
-            logging.info(f"Serving file: {filename} ({file_size} bytes) to {client_address[0]}:{client_address[1]}")
+            client_address = self.client_address
+            logging.info("Serving file: %s (%d bytes) to %s:%d", filename, file_size, client_address[0], client_address[1])
             
-            response_headers = [
-                (':status', '200'),
-                ('content-type', 'application/octet-stream'),
-                ('content-length', str(file_size)),
-                ('server', 'h2-server/2.0'),
-                ('cache-control', 'no-cache'),
-                ('x-file-name', filename),
-                ('x-transfer-id', str(self.request_count))
-            ]
+            # Every indexed file has a cached header block
+            headers_sent = True
+            await self.send_cached_headers(stream_id, HEADER_CACHE[filename], writer)
             
-            self.conn.send_headers(stream_id, response_headers)
-            sock.sendall(self.conn.data_to_send())
+            metrics = self.known_streams[stream_id]
+            metrics.headers_sent_ns = time.monotonic_ns()
             
-            self.known_streams[stream_id]['headers_sent_time'] = time.time()
-            
-            with open(file_path, 'rb') as f:
-                chunk_size = min(16384, self.conn.local_flow_control_window(stream_id))
-                bytes_sent = 0
+            # Small files are served from memory when the whole body fits in the stream's
+            # window and the client takes frames as large as the cached chunks
+            cached_body = FRAME_CACHE.get(filename)
+            if (cached_body is not None
+                    and self.conn.max_outbound_frame_size >= MAX_FRAME_SIZE
+                    and self.conn.local_flow_control_window(stream_id) >= file_size):
+                metrics.first_byte_ns = time.monotonic_ns()
+                await self.send_cached_body(stream_id, cached_body, file_size, writer)
+                self.bytes_sent += file_size
+                metrics.bytes_sent = file_size
+            else:
+                # Unbuffered: the body is only ever mapped or sent with sendfile, never read()
+                with open(file_path, 'rb', buffering=0) as f, self.map_file(f, file_size) as body, \
+                        self.log_progress(stream_id, filename, file_size):
+                    if hasattr(os, 'posix_fadvise'):
+                        # The file is read once, front to back; let the kernel read ahead further
+                        os.posix_fadvise(f.fileno(), 0, file_size, os.POSIX_FADV_SEQUENTIAL)
                 
-                start_time = time.time()
-                last_progress_log = start_time
+                    chunk_size = min(MAX_FRAME_SIZE, self.conn.max_outbound_frame_size)
+                    bytes_sent = 0
                 
-                while True:
-                    chunk = f.read(chunk_size)
-                    if not chunk:
-                        break
+                    metrics.first_byte_ns = time.monotonic_ns()
+                
+                    pending = []
+                    pending_bytes = 0
                     
-                    chunk_len = len(chunk)
+                    # Bind everything the per-chunk loop touches to locals once. The windows
+                    # are read straight off the connection and stream rather than through
+                    # local_flow_control_window(), which looks the stream up on every call
+                    conn = self.conn
+                    stream = self.open_stream(stream_id)
+                    take_window = self.take_window
+                    pack_header = FRAME_HEADER.pack
+                    add_frame = pending.append
                     
-                    if bytes_sent == 0:
-                        self.known_streams[stream_id]['first_byte_time'] = time.time()
+                    while bytes_sent < file_size:
+                        window = min(conn.outbound_flow_control_window, stream.outbound_flow_control_window)
+                        
+                        if window <= 0 and pending:
+                            # The client only returns credit for data it has seen
+                            await self.send_buffers(pending, writer)
+                            pending_bytes = 0
                     
-                    while self.conn.local_flow_control_window(stream_id) < chunk_len:
-                        try:
-                            data = sock.recv(65535)
-                            if not data:
+                        # Frames shrink to whatever window is left, so only an exhausted
+                        # window is waited on; a window smaller than one frame still makes progress
+                        while window <= 0:
+                            if self.closed:
                                 raise ConnectionError("Connection closed during file transfer")
-                            events = self.conn.receive_data(data)
-                            sock.sendall(self.conn.data_to_send())
-                        except socket.timeout:
-                            logging.warning(f"Flow control window delay on stream {stream_id}")
-                    
-                    self.conn.send_data(stream_id, chunk, end_stream=False)
-                    sock.sendall(self.conn.data_to_send())
+                            if stream.closed:
+                                raise ConnectionError(f"Stream {stream_id} closed during file transfer")
+                            # A corked tail segment would sit in the kernel for up to 200 ms
+                            # while the client waits for it before returning credit
+                            self.uncork()
+                            self.window_updated.clear()
+                            try:
+                                await asyncio.wait_for(self.window_updated.wait(), 1.0)
+                            except asyncio.TimeoutError:
+                                logging.warning("Flow control window delay on stream %d", stream_id)
+                            window = min(conn.outbound_flow_control_window, stream.outbound_flow_control_window)
+                        
+                        chunk_len = min(chunk_size, file_size - bytes_sent, window)
                     
-                    bytes_sent += chunk_len
-                    self.bytes_sent += chunk_len
-                    self.known_streams[stream_id]['bytes_sent'] = bytes_sent
+                        if USE_SENDFILE:
+                            await self.send_file_frame(stream, f, bytes_sent, chunk_len, writer)
+                        else:
+                            # Framed here rather than by conn.send_data(), which runs h2's stream
+                            # state machine and flow-control checks again for every chunk
+                            take_window(stream, chunk_len)
+                            # Header and payload stay separate buffers so the payload is never
+                            # copied out of the mapping on its way to the transport
+                            add_frame(pack_header(chunk_len >> 16, chunk_len & 0xFFFF, DATA_FRAME, 0x0, stream_id))
+                            add_frame(body[bytes_sent:bytes_sent + chunk_len])
+                            pending_bytes += 9 + chunk_len
+                            if len(pending) >= 2 * SEND_BATCH_FRAMES or pending_bytes >= SEND_BATCH_BYTES:
+                                await self.send_buffers(pending, writer)
+                                pending_bytes = 0
                     
-                    current_time = time.time()
-                    if file_size > 1024*1024 and current_time - last_progress_log > 1.0:
-                        progress = (bytes_sent / file_size) * 100
-                        elapsed = current_time - start_time
-                        throughput = (bytes_sent * 8) / (elapsed * 1000) if elapsed > 0 else 0
-                        logging.info(f"Transfer progress: {filename} - {progress:.1f}% - {throughput:.2f} kbps")
-                        last_progress_log = current_time
+                        bytes_sent += chunk_len
+                        self.bytes_sent += chunk_len
+                        metrics.bytes_sent = bytes_sent
+                
+                    if pending:
+                        await self.send_buffers(pending, writer)
             
-            self.known_streams[stream_id]['last_byte_time'] = time.time()
+            metrics.last_byte_ns = time.monotonic_ns()
             
             self.conn.end_stream(stream_id)
-            sock.sendall(self.conn.data_to_send())
+            await self.flush(writer)
             
-            transfer_duration = self.known_streams[stream_id]['last_byte_time'] - self.known_streams[stream_id]['first_byte_time']
+            transfer_duration = (metrics.last_byte_ns - metrics.first_byte_ns) / 1e9
             throughput_kbps = (file_size * 8) / (transfer_duration * 1000) if transfer_duration > 0 else 0
             
             logging.info(
-                f"Completed serving: {filename} ({file_size} bytes) to {client_address[0]}:{client_address[1]} "
-                f"in {transfer_duration:.4f}s ({throughput_kbps:.2f} kbps)"
+                "Completed serving: %s (%d bytes) to %s:%d in %.4fs (%.2f kbps)",
+                filename, file_size, client_address[0], client_address[1], transfer_duration, throughput_kbps
             )
             
         except Exception as e:
             logging.error(f"Error serving file {filename}: {e}", exc_info=True)
-            self.send_error_response(stream_id, 500, "Internal Server Error", sock)
+            # Neither a closed connection nor a stream the client reset can carry a response
+            stream = self.conn.streams.get(stream_id)
+            if not self.closed and stream is not None and not stream.closed:
+                if headers_sent:
+                    # The 200 is already out, so the stream can only be failed by resetting it
+                    self.conn.reset_stream(stream_id, error_code=h2.errors.ErrorCodes.INTERNAL_ERROR)
+                    await self.flush(writer)
+                else:
+                    await self.send_error_response(stream_id, 500, "Internal Server Error", writer)
+        finally:
+            # Uncorking pushes out the response's last partial segment right away
+            self.uncork()
+
+    def uncork(self):
+        if not CORK or self.closed:
+            return
+        try:
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, 0)
+        except (OSError, ValueError):
+            # The transport may already have closed the socket
+            pass
+
+    @contextlib.contextmanager
+    def log_progress(self, stream_id, filename, file_size):
+        # Progress on large files is reported from a timer rather than checked per chunk
+        if file_size <= 1024*1024:
+            yield
+            return
+        
+        metrics = self.known_streams[stream_id]
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic_ns()
+        
+        def report():
+            nonlocal timer
+            bytes_sent = metrics.bytes_sent
+            progress = (bytes_sent / file_size) * 100
+            elapsed = (time.monotonic_ns() - start_time) / 1e9
+            throughput = (bytes_sent * 8) / (elapsed * 1000) if elapsed > 0 else 0
+            logging.info("Transfer progress: %s - %.1f%% - %.2f kbps", filename, progress, throughput)
+            timer = loop.call_later(1.0, report)
+        
+        timer = loop.call_later(1.0, report)
+        try:
+            yield
+        finally:
+            timer.cancel()
+
+    @contextlib.contextmanager
+    def map_file(self, f, file_size):
+        # The copy path frames slices of a read-only mapping instead of reading
+        # each chunk into a new bytes object; mapping fails if the file has shrunk
+        if USE_SENDFILE or not file_size:
+            yield None
+            return
+        mapping = mmap.mmap(f.fileno(), file_size, access=mmap.ACCESS_READ)
+        try:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                # fadvise covers read(); page faults on the mapping take their readahead from this
+                mapping.madvise(mmap.MADV_SEQUENTIAL)
+            with memoryview(mapping) as body:
+                yield body
+        finally:
+            try:
+                mapping.close()
+            except BufferError:
+                # The transport still holds slices it hasn't written yet (uvloop and
+                # Python 3.12+ queue them uncopied); the mapping goes away with the last one
+                pass
+
+    async def send_cached_headers(self, stream_id, header_block, writer):
+        stream = self.conn.streams.get(stream_id)
+        if stream is None or stream.closed:
+            raise ConnectionError(f"Stream {stream_id} closed before its response")
+        
+        # Only the transfer id changes per response; h2 needs no record of a HEADERS
+        # frame to send DATA and end the stream afterwards
+        block = header_block + HEADER_ENCODER.encode([
+            hpack.NeverIndexedHeaderTuple('x-transfer-id', str(self.request_count))
+        ])
+        
+        await self.send_buffers([
+            FRAME_HEADER.pack(len(block) >> 16, len(block) & 0xFFFF, HEADERS_FRAME, END_HEADERS, stream_id),
+            block
+        ], writer)
+
+    def open_stream(self, stream_id):
+        stream = self.conn.streams.get(stream_id)
+        if stream is None or stream.closed:
+            raise ConnectionError(f"Stream {stream_id} closed during file transfer")
+        return stream
+
+    def take_window(self, stream, length):
+        if stream.closed:
+            raise ConnectionError(f"Stream {stream.stream_id} closed during file transfer")
+        
+        # Do the flow-control bookkeeping send_data would have done, since the
+        # frame itself bypasses h2
+        self.conn.outbound_flow_control_window -= length
+        stream.outbound_flow_control_window -= length
 
-    def send_error_response(self, stream_id, status_code, message, sock):
-        error_message = f"Error {status_code}: {message}"
+    async def send_file_frame(self, stream, f, offset, length, writer):
+        self.take_window(stream, length)
+        stream_id = stream.stream_id
+        
+        async with self.write_lock:
+            # Frames h2 already queued (SETTINGS/PING acks, WINDOW_UPDATEs) go first so
+            # they are never split by the raw frame
+            self.write_pending(writer)
+            writer.write(FRAME_HEADER.pack(length >> 16, length & 0xFFFF, DATA_FRAME, 0x0, stream_id))
+            if uvloop is not None:
+                await self.sendfile_direct(f, offset, length, writer)
+                return
+            # loop.sendfile() drains the transport first, and falls back to reading and
+            # writing the file where the loop can't use sendfile(2)
+            sent = await asyncio.get_running_loop().sendfile(writer.transport, f, offset, length)
+            if sent != length:
+                raise IOError("File ended before the full body was sent")
+
+    async def sendfile_direct(self, f, offset, length, writer):
+        transport = writer.transport
+        out_fd = self.sock.fileno()
+        in_fd = f.fileno()
+        end = offset + length
+        
+        # Bytes may only bypass the transport while it has nothing queued, or they
+        # would overtake it; the socket is non-blocking, so this stops once it is full
+        while offset < end and not transport.get_write_buffer_size():
+            try:
+                sent = os.sendfile(out_fd, in_fd, offset, end - offset)
+            except BlockingIOError:
+                break
+            if not sent:
+                raise IOError("File ended before the full body was sent")
+            offset += sent
+        
+        if offset < end:
+            # The rest of the frame is queued on the transport, whose drain() is
+            # the only way to wait for the socket under uvloop
+            data = os.pread(in_fd, end - offset, offset)
+            if len(data) != end - offset:
+                raise IOError("File ended before the full body was sent")
+            writer.write(data)
+        await writer.drain()
+
+    async def send_cached_body(self, stream_id, payloads, file_size, writer):
+        self.take_window(self.open_stream(stream_id), file_size)
+        
+        buffers = []
+        for payload in payloads:
+            length = len(payload)
+            buffers.append(FRAME_HEADER.pack(length >> 16, length & 0xFFFF, DATA_FRAME, 0x0, stream_id))
+            buffers.append(payload)
+        await self.send_buffers(buffers, writer)
+
+    async def send_buffers(self, buffers, writer):
+        async with self.write_lock:
+            # Anything h2 queued meanwhile goes ahead of the raw frames, in the same
+            # gathered write
+            data_to_send = self.conn.data_to_send()
+            if data_to_send:
+                buffers.insert(0, data_to_send)
+            writer.writelines(buffers)
+            buffers.clear()
+            await writer.drain()
+
+    async def send_error_response(self, stream_id, status_code, message, writer):
+        error_message = f"Error {status_code}: {message}".encode('utf-8')
         response_headers = [
-            (':status', str(status_code)),
-            ('content-type', 'text/plain'),
-            ('content-length', str(len(error_message))),
+            (b':status', b'%d' % status_code),
+            ERROR_CONTENT_TYPE,
+            (b'content-length', b'%d' % len(error_message)),
         ]
         
         self.conn.send_headers(stream_id, response_headers)
-        self.conn.send_data(stream_id, error_message.encode('utf-8'), end_stream=True)
-        sock.sendall(self.conn.data_to_send())
+        self.conn.send_data(stream_id, error_message, end_stream=True)
+        await self.flush(writer)
         
-        logging.error(f"Error response sent on stream {stream_id}: {status_code} {message}")
+        logging.error("Error response sent on stream %d: %d %s", stream_id, status_code, message)
 
-    def handle_data_received(self, event, sock):
+    def handle_data_received(self, event):
         stream_id = event.stream_id
         
         self.conn.acknowledge_received_data(event.flow_controlled_length, stream_id)
-        sock.sendall(self.conn.data_to_send())
 
-    def handle_stream_ended(self, event, sock):
+    def handle_stream_ended(self, event):
         stream_id = event.stream_id
         
-        if stream_id in self.known_streams:
-            stream_data = self.known_streams[stream_id]
-            if all(key in stream_data for key in ['start_time', 'headers_sent_time', 'first_byte_time', 'last_byte_time']):
-                if None not in [stream_data['start_time'], stream_data['headers_sent_time'], 
-                               stream_data['first_byte_time'], stream_data['last_byte_time']]:
-                    setup_time = stream_data['headers_sent_time'] - stream_data['start_time']
-                    ttfb = stream_data['first_byte_time'] - stream_data['headers_sent_time']
-                    transfer_time = stream_data['last_byte_time'] - stream_data['first_byte_time']
-                    total_time = stream_data['last_byte_time'] - stream_data['start_time']
-                    
-                    logging.info(
-                        f"Stream {stream_id} metrics: Setup={setup_time:.4f}s, TTFB={ttfb:.4f}s, "
-                        f"Transfer={transfer_time:.4f}s, Total={total_time:.4f}s"
-                    )
+        metrics = self.known_streams.pop(stream_id, None)
+        if metrics is not None and metrics.last_byte_ns:
+            setup_time = (metrics.headers_sent_ns - metrics.start_ns) / 1e9
+            ttfb = (metrics.first_byte_ns - metrics.headers_sent_ns) / 1e9
+            transfer_time = (metrics.last_byte_ns - metrics.first_byte_ns) / 1e9
+            total_time = (metrics.last_byte_ns - metrics.start_ns) / 1e9
             
-            del self.known_streams[stream_id]
+            logging.info(
+                "Stream %d metrics: Setup=%.4fs, TTFB=%.4fs, Transfer=%.4fs, Total=%.4fs",
+                stream_id, setup_time, ttfb, transfer_time, total_time
+            )
 
-class H2ClearHandler(socketserver.StreamRequestHandler):
-    def handle(self):
-        try:
-            data = self.request.recv(65535)
-            
-            if b"Upgrade: h2c" in data and b"HTTP2-Settings: " in data:
-                upgrade_response = (
-                    b"HTTP/1.1 101 Switching Protocols\r\n"
-                    b"Connection: Upgrade\r\n"
-                    b"Upgrade: h2c\r\n"
-                    b"\r\n"
-                )
-                self.request.sendall(upgrade_response)
-                
-                protocol = H2Protocol()
-                protocol.handle_request(self.request)
-            else:
-                protocol = H2Protocol()
-                protocol.handle_request(self.request)
+async def handle_conn(reader, writer):
+    try:
+        data = await reader.read(65535)
         
-        except Exception as e:
-            logging.error(f"Error in cleartext handler: {e}", exc_info=True)
+        if not data.startswith(H2_PREFACE) and b"Upgrade: h2c" in data and b"HTTP2-Settings: " in data:
+            upgrade_response = (
+                b"HTTP/1.1 101 Switching Protocols\r\n"
+                b"Connection: Upgrade\r\n"
+                b"Upgrade: h2c\r\n"
+                b"\r\n"
+            )
+            writer.write(upgrade_response)
+            
+            protocol = H2Protocol()
+            await protocol.handle_request(reader, writer)
+        else:
+            protocol = H2Protocol()
+            await protocol.handle_request(reader, writer, data)
+    
+    except Exception as e:
+        logging.error(f"Error in cleartext handler: {e}", exc_info=True)
+    finally:
+        writer.close()
 
-class HTTP2Server(socketserver.ThreadingTCPServer):
-    allow_reuse_address = True
-    daemon_threads = True
+async def serve(host, port):
+    server = await asyncio.start_server(handle_conn, host, port, reuse_address=True)
+    async with server:
+        await server.serve_forever()
 
 def run_server(host='0.0.0.0', port=8080):
     os.makedirs(DATA_DIR, exist_ok=True)
@@ -282,33 +669,43 @@ def run_server(host='0.0.0.0', port=8080):
     
     if os.path.exists(DATA_DIR):
         files = os.listdir(DATA_DIR)
-        file_sizes = {}
+        frame_cache_bytes = 0
         for f in files:
             file_path = os.path.join(DATA_DIR, f)
             if os.path.isfile(file_path):
-                file_sizes[f] = os.path.getsize(file_path)
+                file_size = os.path.getsize(file_path)
+                FILE_INDEX[f] = (file_size, file_path)
+                HEADER_CACHE[f] = encode_response_headers(f, file_size)
+                if file_size <= FRAME_CACHE_MAX_FILE_SIZE and frame_cache_bytes + file_size <= FRAME_CACHE_BUDGET:
+                    FRAME_CACHE[f] = split_file(file_path)
+                    frame_cache_bytes += file_size
         
-        logging.info(f"Available files: {len(files)}")
-        for f, size in file_sizes.items():
+        logging.info(f"Available files: {len(files)} ({len(FRAME_CACHE)} held in memory)")
+        for f, (size, _) in FILE_INDEX.items():
             logging.info(f"  - {f}: {size} bytes")
     else:
         logging.warning(f"Data directory '{DATA_DIR}' not found")
     
-    server = HTTP2Server((host, port), H2ClearHandler)
+    # All connections share one event loop; uvloop's when it is installed
+    loop = uvloop.new_event_loop() if uvloop is not None else asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
     
     protocol_type = "HTTP/2 Cleartext (h2c)"
     logging.info(f"{protocol_type} Server starting on {host}:{port}")
-    logging.info(f"System resources at startup - CPU: {psutil.cpu_percent()}%, Memory: {psutil.virtual_memory().percent}%")
+    SYSTEM_USAGE['cpu_percent'] = psutil.cpu_percent()
+    SYSTEM_USAGE['memory_percent'] = psutil.virtual_memory().percent
+    logging.info(f"System resources at startup - CPU: {SYSTEM_USAGE['cpu_percent']}%, Memory: {SYSTEM_USAGE['memory_percent']}%")
+    threading.Thread(target=sample_system_usage, daemon=True).start()
     
     print(f"{protocol_type} Server starting on {host}:{port}")
     print(f"Ensure '{DATA_DIR}' directory contains the required test files (A_10kB, B_10kB, etc.)")
     
     try:
-        server.serve_forever()
+        loop.run_until_complete(serve(host, port))
     except KeyboardInterrupt:
         pass
     finally:
-        server.server_close()
+        loop.close()
         logging.info("Server shut down")
         print("Server shut down")
 